@@ -1,40 +1,54 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache, partial
+import hashlib
+from itertools import repeat
 import logging
+import math
+import multiprocessing
 import os
 from pathlib import Path
+from typing import Optional
 
 from dotenv import load_dotenv
+import matplotlib
+
+matplotlib.use("Agg")
+from matplotlib.colorbar import make_axes
 import matplotlib.pyplot as plt
-import metpy.calc as mpcalc
+from numcodecs import Blosc
+import numba
 import numpy as np
 import pandas as pd
 import xarray as xr
 from pydap.cas.get_cookies import setup_session
 from pydap.client import open_url
+from requests import Session
+from requests.adapters import HTTPAdapter
+from scipy import ndimage, sparse
 
 logger = logging.getLogger(__name__)
 
+plt.rcParams["contour.algorithm"] = "serial"
 
-def get_data_store(
-    url: str, username: str, password: str
-) -> xr.backends.PydapDataStore:
+
+@lru_cache(maxsize=4)
+def _login(username: str, password: str) -> Session:
+    # one CAS login per account, shared by the MY and NRT stores
     cas_url = "https://cmems-cas.cls.fr/cas/login"
     session = setup_session(cas_url, username, password)
     session.cookies.set("CASTGC", session.cookies.get_dict()["CASTGC"])
-    data_store = xr.backends.PydapDataStore(open_url(url, session=session))
-    return data_store
-
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+    session.mount("https://", adapter)
+    return session
 
-def get_depth(data_depths: np.ndarray, given_depth: float):
-    depth_index = np.argmin(np.abs(data_depths - given_depth))
-    depth_value = data_depths[depth_index]
-    return depth_value
 
-
-def get_time(data_times: np.ndarray, given_time: datetime):
-    time_index = np.argmin(np.abs(pd.to_datetime(data_times) - given_time))
-    time_value = data_times[time_index]
-    return time_value
+def get_data_store(
+    url: str, username: str, password: str
+) -> xr.backends.PydapDataStore:
+    session = _login(username, password)
+    data_store = xr.backends.PydapDataStore(open_url(url, session=session))
+    return data_store
 
 
 def filter_dataset(
@@ -51,36 +65,218 @@ def filter_dataset(
 ) -> xr.Dataset:
     ds = ds[variables]
 
-    lon_query = slice(lon_min, lon_max)
-    lat_query = slice(lat_min, lat_max)
+    # single values are looked up with nearest-neighbour, ranges with slices;
+    # list form keeps the time dimension for the later groupby
+    nearest_query = {}
+    range_query = dict(
+        longitude=slice(lon_min, lon_max),
+        latitude=slice(lat_min, lat_max),
+    )
 
     if start_date != stop_date:
-        time_query = slice(start_date, stop_date)
+        range_query["time"] = slice(start_date, stop_date)
     else:
-        data_times = ds["time"].values
-        time_query = get_time(data_times, start_date)
+        nearest_query["time"] = [start_date]
 
     if not set(variables).issubset(["ZSD", "VHM0"]):
         if depth_min != depth_max:
-            depth_query = slice(depth_min, depth_max)
+            range_query["depth"] = slice(depth_min, depth_max)
         else:
-            data_depths = ds["depth"].values
-            depth_query = get_depth(data_depths, depth_min)
-        ds = ds.sel(
-            longitude=lon_query,
-            latitude=lat_query,
-            time=time_query,
-            depth=depth_query,
-        )
+            nearest_query["depth"] = depth_min
     else:
         logger.warning(f"Depth dimension query is not used in {variables[0]}")
-        ds = ds.sel(longitude=lon_query, latitude=lat_query, time=time_query)
+
+    if nearest_query:
+        ds = ds.sel(nearest_query, method="nearest")
+    ds = ds.sel(range_query)
 
     return ds
 
 
+@numba.vectorize(
+    ["float32(float32, float32)", "float64(float64, float64)"],
+    target="parallel",
+    cache=True,
+)
+def _speed(u, v):
+    return math.sqrt(u * u + v * v)
+
+
 def calculate_velocity(u: xr.DataArray, v: xr.DataArray) -> xr.DataArray:
-    return mpcalc.wind_speed(u, v)
+    speed = xr.apply_ufunc(
+        _speed, u, v, dask="parallelized", output_dtypes=[u.dtype], keep_attrs=False
+    )
+    if "units" in u.attrs:
+        speed.attrs["units"] = u.attrs["units"]
+    return speed
+
+
+def linear_weights(src: np.ndarray, dst: np.ndarray) -> sparse.csr_matrix:
+    # 1-D linear interpolation weights from ascending src points to dst points
+    index = np.searchsorted(src, dst, side="right") - 1
+    index = np.clip(index, 0, len(src) - 2)
+    frac = (dst - src[index]) / (src[index + 1] - src[index])
+    rows = np.arange(len(dst))
+    weights = sparse.csr_matrix(
+        (
+            np.concatenate([1 - frac, frac]),
+            (np.concatenate([rows, rows]), np.concatenate([index, index + 1])),
+        ),
+        shape=(len(dst), len(src)),
+    )
+    weights.eliminate_zeros()
+    return weights
+
+
+def get_regrid_weights(
+    lon: np.ndarray, lat: np.ndarray, new_lon: np.ndarray, new_lat: np.ndarray
+) -> sparse.csr_matrix:
+    # bilinear weights from the flattened (lat, lon) grid to the new grid,
+    # built once and reused for every time step
+    return sparse.kron(
+        linear_weights(lat, new_lat), linear_weights(lon, new_lon), format="csr"
+    )
+
+
+def regrid(
+    da: xr.DataArray,
+    weights: sparse.csr_matrix,
+    new_lon: np.ndarray,
+    new_lat: np.ndarray,
+) -> xr.DataArray:
+    new_shape = (len(new_lat), len(new_lon))
+
+    def apply_weights(a: np.ndarray) -> np.ndarray:
+        slabs = a.reshape(-1, a.shape[-2] * a.shape[-1])
+        out = (weights @ slabs.T).T
+        return out.reshape(a.shape[:-2] + new_shape).astype(a.dtype)
+
+    resampled = xr.apply_ufunc(
+        apply_weights,
+        da,
+        input_core_dims=[["latitude", "longitude"]],
+        output_core_dims=[["latitude", "longitude"]],
+        exclude_dims={"latitude", "longitude"},
+        dask="parallelized",
+        output_dtypes=[da.dtype],
+        dask_gufunc_kwargs={
+            "output_sizes": {"latitude": new_shape[0], "longitude": new_shape[1]}
+        },
+        keep_attrs=True,
+    )
+    return resampled.assign_coords(latitude=new_lat, longitude=new_lon)
+
+
+def interp_bathymetry(
+    altitude: xr.DataArray, new_lon: np.ndarray, new_lat: np.ndarray
+) -> xr.DataArray:
+    # bilinear regrid of a regular (latitude, longitude) grid in one C pass
+    altitude = altitude.transpose("latitude", "longitude")
+    lon = altitude["longitude"].values
+    lat = altitude["latitude"].values
+    lat_grid, lon_grid = np.meshgrid(new_lat, new_lon, indexing="ij")
+    iy = (lat_grid - lat[0]) / (lat[1] - lat[0])
+    ix = (lon_grid - lon[0]) / (lon[1] - lon[0])
+    values = ndimage.map_coordinates(
+        altitude.values, np.stack([iy, ix]), order=1, mode="nearest"
+    )
+    return xr.DataArray(
+        values,
+        coords={"latitude": new_lat, "longitude": new_lon},
+        dims=("latitude", "longitude"),
+        name=altitude.name,
+        attrs=altitude.attrs,
+    )
+
+
+def nn_fill2d(a: np.ndarray) -> np.ndarray:
+    nan_mask = np.isnan(a)
+    if nan_mask.all():
+        return a
+    # index of the nearest valid cell for every cell, computed in one pass
+    indices = ndimage.distance_transform_edt(
+        nan_mask, return_distances=False, return_indices=True
+    )
+    return a[tuple(indices)]
+
+
+def fill_nearest(da: xr.DataArray) -> xr.DataArray:
+    return xr.apply_ufunc(
+        nn_fill2d,
+        da,
+        input_core_dims=[["latitude", "longitude"]],
+        output_core_dims=[["latitude", "longitude"]],
+        vectorize=True,
+        dask="parallelized",
+        output_dtypes=[da.dtype],
+        keep_attrs=True,
+    )
+
+
+def get_cache_path(cache_dir: Path, *params) -> Path:
+    key = hashlib.sha256(repr(params).encode()).hexdigest()[:16]
+    return cache_dir / f"{key}.zarr"
+
+
+@lru_cache(maxsize=1)
+def get_figure() -> dict:
+    # one figure, axes and colorbar per process, reused for every frame; the
+    # colorbar is created by the first rendered frame
+    fig, ax = plt.subplots(figsize=(15, 10))
+    cax, _ = make_axes(ax)
+    return dict(fig=fig, ax=ax, cax=cax, cbar=None)
+
+
+def render_frame(
+    time: datetime,
+    slab: np.ndarray,
+    u: Optional[np.ndarray],
+    v: Optional[np.ndarray],
+    mask: np.ndarray,
+    cfg: dict,
+    output_path: Path,
+) -> Path:
+    # takes plain numpy arrays only so it can run in a worker process
+    figure = get_figure()
+    fig, ax, cbar = figure["fig"], figure["ax"], figure["cbar"]
+    ax.clear()
+
+    # don't contour the all-NaN padding around the valid data
+    lon, lat = cfg["lon"], cfg["lat"]
+    rows = ~np.isnan(slab).all(axis=1)
+    cols = ~np.isnan(slab).all(axis=0)
+    if rows.any():
+        lon, lat, slab = lon[cols], lat[rows], slab[rows][:, cols]
+
+    cf = ax.contourf(
+        lon,
+        lat,
+        slab,
+        cmap="rainbow",
+        levels=cfg["levels"],
+        extend="max",
+        # sharing the colorbar's norm keeps its locator and formatter
+        norm=cbar.norm if cbar is not None else None,
+    )
+    if cbar is None:
+        figure["cbar"] = fig.colorbar(cf, cax=figure["cax"], format="%.1f")
+        figure["cbar"].set_label(cfg["cbar_label"])
+    else:
+        cbar.update_normal(cf)
+
+    if u is not None and v is not None:
+        ax.quiver(cfg["quiver_lon"], cfg["quiver_lat"], u, v, pivot="middle")
+
+    ax.contour(cfg["lon"], cfg["lat"], mask, levels=[0.5], colors="black")
+
+    title = f"{cfg['title']} at {time.strftime('%Y-%m')}"
+    deg_sym = r"$\degree$"
+    ax.set_xlabel(f"Longitude ({deg_sym})")
+    ax.set_ylabel(f"Latitude ({deg_sym})")
+    ax.set_title(title)
+
+    fig.savefig(output_path, bbox_inches="tight")
+    return output_path
 
 
 if __name__ == "__main__":
@@ -94,8 +290,11 @@ if __name__ == "__main__":
     username = os.getenv("CMEMS_USERNAME")
     password = os.getenv("CMEMS_PASSWORD")
 
-    # read parameter in csv file
-    param_df = pd.read_csv("./sources.csv")
+    # read parameter in csv file, keyed by (parameter, temporal)
+    sources = {
+        (row["parameter"], row["temporal"]): row
+        for row in pd.read_csv("./sources.csv").to_dict("records")
+    }
 
     param_dict = dict(
         arus= "sea_water_velocity",
@@ -120,6 +319,8 @@ if __name__ == "__main__":
     lat_max = -7  # degree
 
     temporal_resample_dict = dict(daily="1D", monthly= "1M", annual= "1Y")
+    # number of 3-hourly steps in one (longest) resample bucket
+    temporal_chunk_dict = dict(daily=8, monthly=248, annual=2928)
 
     if not parameter in list(param_dict.keys()):
         raise ValueError(
@@ -133,136 +334,227 @@ if __name__ == "__main__":
     else:
         variables = [variable]
 
-    # filter parameter dataframe based on defined variable
-    param_df = param_df[param_df["parameter"] == variable]
-
-    # filter parameter dataframe based on temporal resolution
+    # get source based on defined variable and temporal resolution
     if parameter == "gelombang":
-        param_df = param_df[param_df["temporal"] == "3-hourly"].iloc[0]
+        source = sources[(variable, "3-hourly")]
     else:
-        param_df = param_df[param_df["temporal"] == temporal].iloc[0]
+        source = sources[(variable, temporal)]
 
     # get initial and near-realtime date
-    init_date = pd.to_datetime(param_df["init_date"]).to_pydatetime()
-    nrt_date = pd.to_datetime(param_df["nrt_date"]).to_pydatetime()
-
-    # check start and stop date to nrt date and populate the opendap url
-    urls = []
-    if (start_date < nrt_date) and (stop_date < nrt_date):
-        url = param_df["opendap_my"]
-        urls.append(url)
-    elif (start_date >= nrt_date) and (stop_date > nrt_date):
-        url = param_df["opendap_nrt"]
-        urls.append(url)
-    elif (start_date < nrt_date) and (stop_date >= nrt_date):
-        url_my = param_df["opendap_my"]
-        url_nrt = param_df["opendap_nrt"]
-        urls.append(url_my)
-        urls.append(url_nrt)
-    else:
+    init_date = pd.to_datetime(source["init_date"]).to_pydatetime()
+    nrt_date = pd.to_datetime(source["nrt_date"]).to_pydatetime()
+
+    # route (start before nrt, stop before nrt) to the opendap urls
+    url_my = source["opendap_my"]
+    url_nrt = source["opendap_nrt"]
+    url_routes = {
+        (True, True): [url_my],
+        (False, False): [url_nrt],
+        (True, False): [url_my, url_nrt],
+    }
+    urls = url_routes.get((start_date < nrt_date, stop_date < nrt_date))
+    if urls is None:
         raise ValueError("Start date must be less than stop date")
 
-    param_title = param_df["title"]
-    value_min = param_df["value_min"]
-    value_max = param_df["value_max"]
-
-    ds_list = []
-    for url in urls:
-        data_store = get_data_store(url, username, password)
-        ds = xr.open_dataset(data_store).metpy.parse_cf()
-        ds = filter_dataset(
-            ds,
-            variables,
-            start_date,
-            stop_date,
-            lon_min,
-            lon_max,
-            lat_min,
-            lat_max,
-            depth_min,
-            depth_max,
-        )
-        if parameter == "gelombang":
-            logger.info(f"Resampling gelombang to {temporal}")
-            ds = ds.resample(time=temporal_resample_dict[temporal]).mean()
+    param_title = source["title"]
+    value_min = np.float32(source["value_min"])
+    value_max = np.float32(source["value_max"])
 
-        ds_list.append(ds)
+    res_deg = 1 / 111.139
 
-    if len(ds_list) > 1:
-        all_ds = xr.concat(ds_list, dim="time")
-    else:
-        all_ds = ds_list[0]
+    # the regridded cube is cached locally, keyed by every request parameter;
+    # dates only, so a stop_date of "now" still hits the cache on the same day
+    cache_path = get_cache_path(
+        Path("./cache"),
+        urls,
+        variables,
+        temporal,
+        start_date.date(),
+        stop_date.date(),
+        depth_min,
+        depth_max,
+        lon_min,
+        lon_max,
+        lat_min,
+        lat_max,
+        res_deg,
+    )
 
-    res_deg = 1 / 111.139
+    if cache_path.exists():
+        logger.info(f"Reading cached dataset from {cache_path}")
+        resample_ds = xr.open_zarr(cache_path)
+    else:
+        # log in once, then fetch the DDS/DAS metadata of the MY and NRT stores
+        # concurrently
+        _login(username, password)
+        with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+            data_stores = list(
+                executor.map(
+                    partial(get_data_store, username=username, password=password),
+                    urls,
+                )
+            )
+        # decode the stores in parallel and slice each one to the requested
+        # variables, bbox, time range and depth before combining, so extra
+        # variables or differing grids between the products don't clash
+        all_ds = xr.open_mfdataset(
+            data_stores,
+            preprocess=partial(
+                filter_dataset,
+                variables=variables,
+                start_date=start_date,
+                stop_date=stop_date,
+                lon_min=lon_min,
+                lon_max=lon_max,
+                lat_min=lat_min,
+                lat_max=lat_max,
+                depth_min=depth_min,
+                depth_max=depth_max,
+            ),
+            parallel=True,
+            combine="nested",
+            concat_dim="time",
+            data_vars="minimal",
+            coords="minimal",
+            compat="override",
+            combine_attrs="override",
+            chunks={"time": 24, "depth": 1, "latitude": 256, "longitude": 256},
+        )
+        # MY and NRT products overlap in time; the sort is stable, so the MY
+        # value wins for timestamps present in both
+        all_ds = all_ds.sortby("time")
+        all_ds = all_ds.sel(time=~all_ds.get_index("time").duplicated())
+        # float32 halves the memory traffic of the regrid/fill/mask pipeline
+        all_ds = all_ds.astype("float32")
 
-    new_lon = np.arange(all_ds["longitude"].min(), all_ds["longitude"].max(), res_deg)
-    new_lat = np.arange(all_ds["latitude"].min(), all_ds["latitude"].max(), res_deg)
+        if parameter == "arus":
+            all_ds[variable] = calculate_velocity(
+                all_ds[variables[0]], all_ds[variables[1]]
+            )
 
-    gmrt = xr.open_dataset("./GMRT_baliutara.grd").metpy.parse_cf()
-    gmrt = gmrt.rename({"lon": "longitude", "lat": "latitude"})
-    gmrt = gmrt.interp(longitude=new_lon, latitude=new_lat)
-    altitude = gmrt.altitude
-    altitude = altitude < 0
+        if parameter == "gelombang":
+            logger.info(f"Resampling gelombang to {temporal}")
+            # keep each resample bucket within a chunk or two so the reduction
+            # graph stays small, and let flox reduce all buckets in one pass
+            all_ds = all_ds.chunk(
+                {
+                    "time": temporal_chunk_dict[temporal],
+                    "latitude": -1,
+                    "longitude": -1,
+                }
+            )
+            all_ds = all_ds.resample(time=temporal_resample_dict[temporal]).mean(
+                engine="flox", method="cohorts"
+            )
 
-    if parameter == "arus":
-        all_ds[variable] = calculate_velocity(
-            all_ds[variables[0]], all_ds[variables[1]]
+        new_lon = np.arange(
+            all_ds["longitude"].min(), all_ds["longitude"].max(), res_deg
+        )
+        new_lat = np.arange(
+            all_ds["latitude"].min(), all_ds["latitude"].max(), res_deg
         )
 
-    resample_ds = all_ds.interp(longitude=new_lon, latitude=new_lat)
-    resample_ds = resample_ds.interpolate_na(
-        dim="longitude", method="nearest", fill_value="extrapolate"
-    ).interpolate_na(dim="latitude", method="nearest", fill_value="extrapolate")
+        weights = get_regrid_weights(
+            all_ds["longitude"].values, all_ds["latitude"].values, new_lon, new_lat
+        )
+        resample_ds = all_ds.chunk({"latitude": -1, "longitude": -1})
+        resample_ds = resample_ds.map(
+            regrid, keep_attrs=True, args=(weights, new_lon, new_lat)
+        )
+        resample_ds = resample_ds.map(fill_nearest, keep_attrs=True)
+
+        # zarr needs uniform chunks along time
+        resample_ds = resample_ds.chunk({"time": 24})
+        compressor = Blosc(cname="zstd", clevel=3, shuffle=Blosc.SHUFFLE)
+        encoding = {
+            name: {"compressor": compressor} for name in resample_ds.data_vars
+        }
+        # write to a temporary store and rename it on success, so an
+        # interrupted run never leaves a partial store behind as a cache hit
+        tmp_path = cache_path.with_name(f"{cache_path.name}.tmp")
+        resample_ds.to_zarr(tmp_path, mode="w", encoding=encoding, compute=True)
+        tmp_path.rename(cache_path)
+        logger.info(f"Cached dataset to {cache_path}")
+        resample_ds = xr.open_zarr(cache_path)
+
+    gmrt = xr.open_dataset("./GMRT_baliutara.grd")
+    gmrt = gmrt.rename({"lon": "longitude", "lat": "latitude"})
+    altitude = interp_bathymetry(
+        gmrt.altitude,
+        resample_ds["longitude"].values,
+        resample_ds["latitude"].values,
+    )
 
-    resample_ds = resample_ds.where(altitude)
+    # materialize the sea mask once, aligned to the output grid, so the
+    # where below broadcasts a plain array instead of re-aligning per chunk
+    mask = (altitude < 0).astype(bool)
+    mask = mask.reindex_like(resample_ds[variable].isel(time=0, drop=True))
+    resample_ds = resample_ds.where(mask.data)
 
     output_dir = Path("./output") / parameter
     output_dir.mkdir(parents=True, exist_ok=True)
 
     skip = 10
 
-    for time, ds in resample_ds.groupby("time"):
-        time = pd.to_datetime(time).to_pydatetime()
-
-        fig, ax = plt.subplots(figsize=(15, 10))
-
-        cf = ds[variable].plot.contourf(
-            cmap="rainbow",
-            vmin=value_min,
-            vmax=value_max,
-            levels=10,
-            extend="max",
-            cbar_kwargs={"format": "%.1f"},
-            ax=ax,
+    # compute the dask graph and the decimated quiver grid once instead of
+    # once per plotted time step
+    contour_ds = resample_ds.compute()
+    if parameter == "arus":
+        quiver_ds = contour_ds.isel(
+            longitude=slice(None, None, skip),
+            latitude=slice(None, None, skip),
         )
 
-        if parameter == "arus":
-            q = ds.isel(
-                longitude=slice(None, None, skip),
-                latitude=slice(None, None, skip),
-            ).plot.quiver(
-                x="longitude",
-                y="latitude",
-                u=variables[0],
-                v=variables[1],
-                ax=ax,
-            )
-
-        c = altitude.plot.contour(cmap="black", ax=ax)
-
-        # cbar = cf.colorbar
-        # ms_sym = r"$ms^{-1}$"
-        cbar_text = f"{param_title}"
-        title = f"{param_title} at {time.strftime('%Y-%m')}"
-        # cbar.ax.set_ylabel(cbar_text)
-        # ax.set_xlim([lon_min, lon_max])
-        # ax.set_ylim([lat_min, lat_max])
-        deg_sym = r"$\degree$"
-        ax.set_xlabel(f"Longitude ({deg_sym})")
-        ax.set_ylabel(f"Latitude ({deg_sym})")
-        ax.set_title(title)
-
-        output_path = output_dir / f"{parameter}_{time.strftime('%Y%m')}.png"
+    # colorbar label from the variable attrs, as xarray's plot methods do
+    attrs = contour_ds[variable].attrs
+    cbar_label = attrs.get("long_name", attrs.get("standard_name", variable))
+    if "units" in attrs:
+        cbar_label = f"{cbar_label} [{attrs['units']}]"
+
+    cfg = dict(
+        lon=contour_ds["longitude"].values,
+        lat=contour_ds["latitude"].values,
+        title=param_title,
+        cbar_label=cbar_label,
+        levels=np.linspace(value_min, value_max, 11, dtype=np.float32),
+    )
+    if parameter == "arus":
+        cfg.update(
+            quiver_lon=quiver_ds["longitude"].values,
+            quiver_lat=quiver_ds["latitude"].values,
+        )
 
-        fig.savefig(output_path, bbox_inches="tight")
-        logger.info(f"Saved to {output_path}")
+    # convert the time index once rather than looking up each frame by label
+    times = list(contour_ds.indexes["time"].to_pydatetime())
+    slabs = list(contour_ds[variable].transpose("time", ...).values)
+    if parameter == "arus":
+        us = list(quiver_ds[variables[0]].transpose("time", ...).values)
+        vs = list(quiver_ds[variables[1]].transpose("time", ...).values)
+    else:
+        us = vs = [None] * len(times)
+    output_paths = [
+        output_dir / f"{parameter}_{time.strftime('%Y%m')}.png" for time in times
+    ]
+
+    # render frames in parallel, figure drawing and png encoding are cpu-bound.
+    # Workers must not be forked from this process: numba's GNU OpenMP
+    # threading layer is not fork-safe once the parallel ufunc has run.
+    # forkserver isn't available on Windows, so fall back to spawn there.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context("forkserver")
+    else:
+        mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=os.cpu_count(), mp_context=mp_context
+    ) as executor:
+        for output_path in executor.map(
+            render_frame,
+            times,
+            slabs,
+            us,
+            vs,
+            repeat(mask.values.astype(np.uint8)),
+            repeat(cfg),
+            output_paths,
+        ):
+            logger.info(f"Saved to {output_path}")